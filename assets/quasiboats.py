@@ -1,3 +1,4 @@
+import gc
 import time
 import random
 
@@ -9,11 +10,42 @@ try:
 except ImportError:
     pass  # lv is already available as a global in MicroPython OS
 
+try:
+    import micropython
+except ImportError:
+    class micropython:
+        """Fallback so const() is a no-op outside MicroPython"""
+
+        @staticmethod
+        def const(value):
+            return value
+
+const = micropython.const
+
+# Per-event debug output, folded away by the MicroPython compiler when False
+DEBUG = const(False)
+
 
 class Boat:
     """Represents a boat on the grid (player or yacht obstacle)"""
 
-    def __init__(self, row, col, length, is_horizontal, is_player=False, color="white"):
+    # Fixed attribute layout, saves the per-instance dict where __slots__ is supported
+    __slots__ = (
+        "row", "col", "length", "is_horizontal", "is_player", "color", "img",
+        "drag_start_row", "drag_start_col", "selected", "outline_color",
+        "drag_min", "drag_max", "max_start", "cells", "mask", "can_move_to",
+    )
+
+    # Bits per row in occupancy masks, cell (row, col) is bit row * MASK_STRIDE + col
+    MASK_STRIDE = 16
+    # COLUMN_RUNS[n] has n consecutive cells down one column, starting at bit 0
+    COLUMN_RUNS = [0]
+    for _ in range(MASK_STRIDE):
+        COLUMN_RUNS.append(COLUMN_RUNS[-1] << MASK_STRIDE | 1)
+    COLUMN_RUNS = tuple(COLUMN_RUNS)
+    del _
+
+    def __init__(self, row, col, length, is_horizontal, grid_size, is_player=False, color="white"):
         self.row = row  # Top-left position
         self.col = col
         self.length = length  # 2, 3, or 4 cells
@@ -23,64 +55,95 @@ class Boat:
         self.img = None  # LVGL image object
         self.drag_start_row = None
         self.drag_start_col = None
+        self.drag_min = 0  # Free range along the moving axis, set when a drag starts
+        self.drag_max = 0
         self.selected = False
+        self.outline_color = None  # Outline currently applied to img, None if none
+        self.max_start = grid_size - length  # Highest row/col along the moving axis
+        self.cells = self._build_cells()  # Cached, rebuilt by move_to()
+        self.mask = self._build_mask()  # Occupancy bits, rebuilt by move_to()
+        # can_move_to(new_row, new_col, grid_size, occupancy) checks bounds and path blocking,
+        # the orientation never changes so the matching check is picked once here
+        self.can_move_to = self._can_move_to_h if is_horizontal else self._can_move_to_v
+
+    def _build_cells(self):
+        if self.is_horizontal:
+            return tuple((self.row, self.col + i) for i in range(self.length))
+        return tuple((self.row + i, self.col) for i in range(self.length))
 
-    def get_cells(self):
-        """Return list of (row, col) tuples occupied by this boat"""
-        cells = []
+    def _build_mask(self):
+        step = 1 if self.is_horizontal else self.MASK_STRIDE
+        bit = 1 << (self.row * self.MASK_STRIDE + self.col)
+        mask = 0
         for i in range(self.length):
-            if self.is_horizontal:
-                cells.append((self.row, self.col + i))
-            else:
-                cells.append((self.row + i, self.col))
-        return cells
+            mask |= bit
+            bit <<= step
+        return mask
 
-    def can_move_to(self, new_row, new_col, grid_size, all_boats):
-        """Check if boat can move to new position, checking for path blocking"""
+    def move_to(self, row, col):
+        """Move the boat and refresh its cached cells and mask"""
+        self.row = row
+        self.col = col
+        self.cells = self._build_cells()
+        self.mask = self._build_mask()
+
+    def get_cells(self):
+        """Return tuple of (row, col) tuples occupied by this boat"""
+        return self.cells
+
+    def _can_move_to_h(self, new_row, new_col, grid_size, occupancy):
+        """can_move_to() for horizontal boats"""
         # Check bounds
-        if new_row < 0 or new_col < 0:
+        if new_col < 0 or new_col > self.max_start or new_row < 0 or new_row >= grid_size:
             return False
-        if self.is_horizontal:
-            if new_col + self.length > grid_size or new_row >= grid_size:
-                return False
+        # Check path, the cells swept into never include the boat's own cells
+        col = self.col
+        if new_col > col:
+            path = ((1 << (new_col - col)) - 1) << (self.row * self.MASK_STRIDE + col + self.length)
+        else:
+            path = ((1 << (col - new_col)) - 1) << (self.row * self.MASK_STRIDE + new_col)
+        return not occupancy & path
+
+    def _can_move_to_v(self, new_row, new_col, grid_size, occupancy):
+        """can_move_to() for vertical boats"""
+        # Check bounds
+        if new_row < 0 or new_row > self.max_start or new_col < 0 or new_col >= grid_size:
+            return False
+        # Check path, the cells swept into never include the boat's own cells
+        row = self.row
+        if new_row > row:
+            path = self.COLUMN_RUNS[new_row - row] << ((row + self.length) * self.MASK_STRIDE + self.col)
         else:
-            if new_row + self.length > grid_size or new_col >= grid_size:
-                return False
+            path = self.COLUMN_RUNS[row - new_row] << (new_row * self.MASK_STRIDE + self.col)
+        return not occupancy & path
 
-        # Check path
+    def get_move_range(self, occupancy):
+        """Return the (lowest, highest) row/col along the moving axis the boat can reach"""
         if self.is_horizontal:
-            step = 1 if new_col > self.col else -1
-            curr_col = self.col
-            while curr_col != new_col:
-                curr_col += step
-                if not self._is_pos_free(self.row, curr_col, all_boats):
-                    return False
+            pos = self.col
+            shift = 1
         else:
-            step = 1 if new_row > self.row else -1
-            curr_row = self.row
-            while curr_row != new_row:
-                curr_row += step
-                if not self._is_pos_free(curr_row, self.col, all_boats):
-                    return False
-
-        return True
-
-    def _is_pos_free(self, row, col, all_boats):
-        """Check if boat can be at this position (row, col) without overlap"""
-        new_cells_set = set()
-        for i in range(self.length):
-            if self.is_horizontal:
-                new_cells_set.add((row, col + i))
-            else:
-                new_cells_set.add((row + i, col))
-        
-        for boat in all_boats:
-            if boat is self:
-                continue
-            for cell in boat.get_cells():
-                if cell in new_cells_set:
-                    return False
-        return True
+            pos = self.row
+            shift = self.MASK_STRIDE
+        mask = self.mask
+        others = occupancy ^ mask
+
+        low = pos
+        step_mask = mask
+        while low > 0:
+            step_mask >>= shift
+            if others & step_mask:
+                break
+            low -= 1
+
+        high = pos
+        step_mask = mask
+        while high < self.max_start:
+            step_mask <<= shift
+            if others & step_mask:
+                break
+            high += 1
+        return low, high
 
 
 class QuasiBoats(Activity):
@@ -88,6 +151,7 @@ class QuasiBoats(Activity):
 
     # Asset path
     ASSET_PATH = "M:apps/com.quasikili.quasiboats/assets/"
+    boat_srcs = {} # Boat image paths keyed by (is_player, is_horizontal, length)
 
     # Screen dimensions
     SCREEN_WIDTH = 320
@@ -98,20 +162,31 @@ class QuasiBoats(Activity):
     MAX_GRID_SIZE = 10
     DEFAULT_GRID_SIZE = 6
 
+    # Unit moves a puzzle start should need at least, per grid size, before another layout
+    # is tried. Roughly what the capped search in find_start_state() reaches on each size.
+    MIN_START_MOVES = {4: 3, 5: 4, 6: 5, 7: 4, 8: 4, 9: 3, 10: 3}
+
     # Fixed grid pixel size (fullscreen height minus padding)
     GRID_PIXEL_SIZE = 230  # Leave small margin
 
     # UI dimensions
     RIGHT_PANEL_WIDTH = 75
 
+    # Elapsed time text, minutes:seconds
+    TIME_FORMAT = "%d:%02d"
+    MOVES_FORMAT = "Moves\n%d"
+
     # Calculated per grid size
     cell_size = 0
+    cell_px = () # Pixel offset of each row/col index, cell_px[i] == i * cell_size
+    img_scale = 256 # LVGL image scale for boat sprites, 256 is 100%
     grid_offset_x = 10
     grid_offset_y = 5
 
     # Game state
     grid_size = DEFAULT_GRID_SIZE
     boats = []
+    grid_occupancy = 0 # Union of all boat masks, see Boat.MASK_STRIDE
     player_boat = None
     selected_boat = None
     dragging_boat = None
@@ -119,34 +194,67 @@ class QuasiBoats(Activity):
     start_time = 0
     game_won = False
     current_seed = 0
+    start_layout = None # (grid_size, seed, boat specs) of the current puzzle's start, for on_reset
+    next_game = None # (grid_size, seed, boats) from prepare_next_game
+    next_game_steps = None # prepare_next_game() generator while the next puzzle is being generated
     move_locked = False  # For keyboard control with Enter held
-    drag_dots = [] # Store dot objects for selected boat
+    drag_dots = () # The two pooled drag dots, 0 left/up, 1 right/down, hidden when unused
+    shown_dot_masks = [] # Mask of the boat each drag dot is aligned to, None while hidden
     update_timer = None # Reference to LVGL timer for frame updates
-
-    # Waves
-    waves = []
+    indev_point = None # lv.point_t reused by on_boat_pressing
+    drag_indev = None # Input device of the current touch drag
+    focus_group = None # Default LVGL group, looked up once in onCreate
+    boat_imgs = [] # Boat images, kept across games and hidden when not needed
+    boat_by_img = {} # Boat for each boat image, used by the shared event callbacks
+    boat_event_cbs = () # (callback, event code) pairs shared by all boat images
+    key_actions = {} # Screen key code -> handler(event)
+    key_deltas = {} # Arrow key code -> (row, col) step
+    lock_keys = () # Key codes that toggle move_locked, built in onCreate
+    prefs = None
+    prefs_dirty = False # grid_size changed but not yet committed
+
+    # Waves, kept as parallel lists (one entry per wave) for the per-frame loop
+    wave_objs = []
+    wave_x = [] # 16.16 fixed point, see WAVE_SHIFT
+    wave_px = [] # Last integer x passed to set_pos
+    wave_y = []
+    wave_widths = []
+    wave_speeds = [] # 16.16 fixed point pixels per millisecond
     num_waves = 30
     wave_speed = 20 # pixels per second
+    WAVE_SHIFT = 16
+    wave_rng = 0xACE1 # 16-bit xorshift state for wave respawn heights
 
     # UI Elements
     screen = None
     water_bg = None
     grid_container = None
+    exit_marker = None
+    exit_arrow = None
     exit_row = 0
+    win_col = 0 # Player boat column that reaches the exit
 
     # Time tracking for animations
     last_update_time = 0
+    shown_seconds = -1 # Elapsed seconds currently shown in time_label
+    shown_moves = 0 # Move count currently shown in moves_label
 
     # UI labels
     moves_label = None
     time_label = None
     seed_label = None
     win_label = None
-    menu_modal = None
+    menu_modal = None # Built on first open, then only hidden and shown
+    menu_open = False
+    menu_focus_btn = None # Focused each time the menu opens
 
     # colors
     wood_bg_color = 0x8B4513
     wood_border_color = 0x654321
+    wood_bg = None # lv.color_hex(wood_bg_color), built once in onCreate
+    wood_border = None # lv.color_hex(wood_border_color), built once in onCreate
+    lv_colors = {} # Hex color -> lv color, for colors applied repeatedly, see _lv_color()
+    focus_style = None # lv.style_t shared by all buttons for the FOCUS_KEY state
 
     def onCreate(self):
         print("Quasi Boats starting...")
@@ -158,8 +266,12 @@ class QuasiBoats(Activity):
         self.GRID_PIXEL_SIZE = self.SCREEN_HEIGHT - 10
 
         # Load preferences
-        prefs = SharedPreferences("com.quasikili.quasiboats")
-        self.grid_size = prefs.get_int("grid_size", self.DEFAULT_GRID_SIZE)
+        self.prefs = SharedPreferences("com.quasikili.quasiboats")
+        self.grid_size = self.prefs.get_int("grid_size", self.DEFAULT_GRID_SIZE)
+
+        # Wood colors are shared by the panels and the exit marker
+        self.wood_bg = lv.color_hex(self.wood_bg_color)
+        self.wood_border = lv.color_hex(self.wood_border_color)
 
         # Create screen
         self.screen = lv.obj()
@@ -167,13 +279,51 @@ class QuasiBoats(Activity):
         self.screen.set_scrollbar_mode(lv.SCROLLBAR_MODE.OFF)
         self.screen.remove_flag(lv.obj.FLAG.SCROLLABLE)
 
-        # Make screen focusable
-        focusgroup = lv.group_get_default()
-        if focusgroup:
-            focusgroup.add_obj(self.screen)
+        # Make screen focusable, the group is kept for the boat handlers
+        self.focus_group = lv.group_get_default()
+        if self.focus_group:
+            self.focus_group.add_obj(self.screen)
 
         # Event handlers
         self.screen.add_event_cb(self.on_key, lv.EVENT.KEY, None)
+        self.key_actions = {
+            ord("R"): self.on_reset,
+            ord("r"): self.on_reset,
+            ord("N"): self.on_new_game,
+            ord("n"): self.on_new_game,
+            ord("M"): self.show_menu,
+            ord("m"): self.show_menu,
+        }
+        # Keys that toggle move_locked on the focused boat
+        self.lock_keys = (lv.KEY.ENTER, ord("A"), ord("a"))
+        # Arrow key code -> (row, col) step for the selected boat
+        self.key_deltas = {
+            lv.KEY.UP: (-1, 0),
+            lv.KEY.DOWN: (1, 0),
+            lv.KEY.LEFT: (0, -1),
+            lv.KEY.RIGHT: (0, 1),
+        }
+
+        self.indev_point = lv.point_t()
+        self.boat_imgs = []
+        self.lv_colors = {}
+
+        # One shared focus style for all buttons, instead of local style properties on each
+        self.focus_style = lv.style_t()
+        self.focus_style.init()
+        self.focus_style.set_outline_width(2)
+        self.focus_style.set_outline_color(self._lv_color(0xFFFFFF))
+        self.focus_style.set_outline_opa(255)
+
+        # Boat image callbacks are created once and shared by every boat
+        self.boat_event_cbs = (
+            (self._boat_event_cb(self.on_boat_pressed), lv.EVENT.PRESSED),
+            (self._boat_event_cb(self.on_boat_pressing), lv.EVENT.PRESSING),
+            (self._boat_event_cb(self.on_boat_released), lv.EVENT.RELEASED),
+            (self._boat_event_cb(self.on_boat_focused), lv.EVENT.FOCUSED),
+            (self._boat_event_cb(self.on_boat_defocused), lv.EVENT.DEFOCUSED),
+            (self._boat_event_cb(self.on_boat_key), lv.EVENT.KEY),
+        )
 
         # Create UI
         self.create_ui()
@@ -201,6 +351,9 @@ class QuasiBoats(Activity):
     def calculate_cell_size(self):
         """Calculate cell size based on grid size to fit in fixed grid area"""
         self.cell_size = self.GRID_PIXEL_SIZE // self.grid_size
+        self.cell_px = tuple(i * self.cell_size for i in range(self.MAX_GRID_SIZE + 1))
+        # Scale image to fit cell size (assets are 40px)
+        self.img_scale = (self.cell_size * 256) // 40
 
     def create_ui(self):
         """Create the UI elements"""
@@ -217,6 +370,13 @@ class QuasiBoats(Activity):
         self.water_bg.remove_flag(lv.obj.FLAG.SCROLLABLE)
 
         # Create waves
+        self.wave_objs = []
+        self.wave_x = []
+        self.wave_px = []
+        self.wave_y = []
+        self.wave_widths = []
+        self.wave_speeds = []
+        self.wave_rng = (time.ticks_ms() & 0xFFFF) or 0xACE1
         for i in range(self.num_waves):
             wave_width = 4
             wave_height = wave_width
@@ -225,15 +385,14 @@ class QuasiBoats(Activity):
             x = random.randint(0, self.SCREEN_WIDTH)
             y = random.randint(0, self.SCREEN_HEIGHT)
             wave_obj = self._create_wave_line(self.water_bg, x, y, wave_width, wave_height)
-            self.waves.append({
-                "obj": wave_obj,
-                "x": float(x),
-                "y": float(y),
-                "width": float(wave_width),
-                "height": float(wave_height),
-                "speed_multiplier": 1 # Individual speed variation
-                # "speed_multiplier": random.uniform(0.7, 1.3) # Individual speed variation
-            })
+            self.wave_objs.append(wave_obj)
+            self.wave_x.append(x << self.WAVE_SHIFT)
+            self.wave_px.append(x)
+            self.wave_y.append(y)
+            self.wave_widths.append(wave_width)
+            speed_multiplier = 1 # Individual speed variation
+            # speed_multiplier = random.uniform(0.7, 1.3) # Individual speed variation
+            self.wave_speeds.append(int(self.wave_speed * speed_multiplier * (1 << self.WAVE_SHIFT)) // 1000)
 
         # Create grid container (fixed size, aligned left)
         # Added 4px for border to avoid clipping
@@ -242,7 +401,7 @@ class QuasiBoats(Activity):
         self._create_grid_container(grid_pixel_size)
 
         self._create_exit_marker()
-
+        self._create_drag_dots()
 
         # Right panel - Info and controls
         right_panel_content_size = self.grid_size * self.cell_size
@@ -302,7 +461,7 @@ class QuasiBoats(Activity):
 
         # Moves counter
         self.moves_label = lv.label(parent)
-        self.moves_label.set_text("Moves\n0")
+        self.moves_label.set_text(self.MOVES_FORMAT % 0)
         self.moves_label.set_style_text_color(lv.color_hex(0xFFFFFF), 0)
         self.moves_label.set_style_text_font(lv.font_montserrat_12, 0)
         self.moves_label.set_style_text_align(lv.TEXT_ALIGN.CENTER, 0)
@@ -313,8 +472,8 @@ class QuasiBoats(Activity):
         self.win_panel_container = lv.obj(self.screen)
         self.win_panel_container.set_size(200, 140) # Adjust size as needed
         self.win_panel_container.align_to(grid_container, lv.ALIGN.CENTER, 0, 0) # Centered on grid container
-        self.win_panel_container.set_style_bg_color(lv.color_hex(self.wood_bg_color), 0)  # Wooden plank color
-        self.win_panel_container.set_style_border_color(lv.color_hex(self.wood_border_color), 0)
+        self.win_panel_container.set_style_bg_color(self.wood_bg, 0)  # Wooden plank color
+        self.win_panel_container.set_style_border_color(self.wood_border, 0)
         self.win_panel_container.set_style_radius(10, 0)
         self.win_panel_container.set_style_pad_all(10, 0)
         self.win_panel_container.set_flex_flow(lv.FLEX_FLOW.COLUMN)
@@ -335,8 +494,8 @@ class QuasiBoats(Activity):
         self.info_panel_container = lv.obj(self.screen)
         self.info_panel_container.set_size(self.RIGHT_PANEL_WIDTH, 70) # Adjusted size
         self.info_panel_container.set_pos(right_panel_x, 5)
-        self.info_panel_container.set_style_bg_color(lv.color_hex(self.wood_bg_color), 0)  # Wooden plank color
-        self.info_panel_container.set_style_border_color(lv.color_hex(self.wood_border_color), 0)
+        self.info_panel_container.set_style_bg_color(self.wood_bg, 0)  # Wooden plank color
+        self.info_panel_container.set_style_border_color(self.wood_border, 0)
         self.info_panel_container.set_style_radius(5, 0)
         self.info_panel_container.set_style_pad_all(5, 0)
         self.info_panel_container.set_flex_flow(lv.FLEX_FLOW.COLUMN)
@@ -346,11 +505,21 @@ class QuasiBoats(Activity):
 
     def show_menu(self, event):
         """Show menu popup"""
-        if self.menu_modal:
+        if self.menu_open:
             return
+        self.menu_open = True
 
+        if self.menu_modal:
+            self.menu_modal.remove_flag(lv.obj.FLAG.HIDDEN)
+        else:
+            self._create_menu()
+        if self.focus_group:
+            InputManager.emulate_focus_obj(self.focus_group, self.menu_focus_btn)
+
+    def _create_menu(self):
+        """Build the menu popup once; it lives on the screen so it goes away with it"""
         # Create modal background
-        self.menu_modal = lv.obj(lv.layer_top())
+        self.menu_modal = lv.obj(self.screen)
         self.menu_modal.set_size(self.SCREEN_WIDTH, self.SCREEN_HEIGHT)
         self.menu_modal.set_style_bg_color(lv.color_hex(0x000000), 0)
         self.menu_modal.set_style_bg_opa(150, 0)
@@ -403,7 +572,7 @@ class QuasiBoats(Activity):
         self._add_focus_style(size_minus_btn)
         if focusgroup:
             focusgroup.add_obj(size_minus_btn)
-            InputManager.emulate_focus_obj(focusgroup, size_minus_btn)
+        self.menu_focus_btn = size_minus_btn
 
         size_plus_btn = lv.button(size_container)
         size_plus_btn.set_size(40, 30) # Slightly smaller button
@@ -449,14 +618,26 @@ class QuasiBoats(Activity):
             label.set_text(f"Grid: {self.grid_size}x{self.grid_size}")
             label.align(lv.ALIGN.TOP_MID, 0, 40)
 
-            # Save preference
-            editor = SharedPreferences("com.quasikili.quasiboats").edit()
+            # A puzzle prepared or half generated for the old size is no use now
+            self.next_game = None
+            self.next_game_steps = None
+
+            # Saved once when the menu closes, not on every +/- press
+            self.prefs_dirty = True
+
+    def save_prefs(self):
+        """Commit pending preference changes"""
+        if self.prefs_dirty:
+            editor = self.prefs.edit()
             editor.put_int("grid_size", self.grid_size)
             editor.commit()
+            self.prefs_dirty = False
 
     def close_menu(self):
         """Close menu and recreate grid if size changed"""
-        if self.menu_modal:
+        if self.menu_open:
+            self.save_prefs()
+
             # Check if grid size changed
             old_cell_size = self.cell_size
             self.calculate_cell_size()
@@ -465,81 +646,56 @@ class QuasiBoats(Activity):
                 # Grid size changed - recreate
                 self.recreate_grid()
 
-            self.menu_modal.delete()
-            self.menu_modal = None
+            # Hidden buttons stay in the focus group but are skipped while hidden
+            self.menu_modal.add_flag(lv.obj.FLAG.HIDDEN)
+            self.menu_open = False
+            if self.focus_group:
+                InputManager.emulate_focus_obj(self.focus_group, self.screen)
 
     def new_game(self, seed=None):
-        """Generate a new random puzzle and ensure it's solvable"""
+        """Start a new random puzzle that is guaranteed to be solvable"""
+        boats = None
         if seed is None:
-            seed = random.randint(1, 999999)
+            if self.next_game_steps is not None:
+                # Finish the puzzle that's half generated rather than starting another one
+                self._run_steps(self.next_game_steps)
+                self.next_game_steps = None
+            # Use the puzzle prepare_next_game() generated ahead, if it fits the grid
+            next_game = self.next_game
+            self.next_game = None
+            if next_game and next_game[0] == self.grid_size:
+                grid_size, seed, boats = next_game
+            else:
+                seed = self._new_seed()
 
         self.current_seed = seed
         self.seed_label.set_text(f"#{seed}")
 
-        random.seed(seed)
+        if boats is None:
+            boats = self._run_steps(self._generate_boats(seed))
+        # Resetting rebuilds this start instead of searching for it again
+        self.start_layout = (
+            self.grid_size, seed, tuple((b.row, b.col, b.length, b.is_horizontal) for b in boats)
+        )
 
-        # Generate puzzle with solvability check
-        max_gen_attempts = 5
-        for gen_attempt in range(max_gen_attempts):
-            # Clear existing boats
-            for boat in self.boats:
-                if boat.img:
-                    boat.img.delete()
-            self.boats = []
-            self.selected_boat = None
-            self.dragging_boat = None
-
-            # Generate puzzle
-            self.exit_row = self.grid_size // 2
-
-            # Create player boat
-            player_col = random.randint(0, max(0, self.grid_size - 2)) # Player boat is always length 2
-            self.player_boat = Boat(self.exit_row, player_col, 2, True, True, "red")
-            self.boats.append(self.player_boat)
+        # Replace the boats, their images are reused by create_boat_images()
+        self.boats = boats
+        self.player_boat = boats[0]
+        self.boat_by_img = {}
+        self.selected_boat = None
+        self.dragging_boat = None
+        self.win_col = self.grid_size - self.player_boat.length
 
-            # Generate obstacle yachts
-            num_obstacles = min(self.grid_size + 1, 10)
-            # Only use white yachts
-            colors = ["white"]
-
-            attempts = 0
-            max_attempts = 200
-            while len(self.boats) < num_obstacles and attempts < max_attempts:
-                attempts += 1
-                # Only use lengths 2 and 3 for yachts
-                length = random.choice([2, 3])
-                is_horizontal = random.choice([True, False])
-                color = random.choice(colors)
-
-                if is_horizontal:
-                    col = random.randint(0, self.grid_size - length)
-                    row = random.randint(0, self.grid_size - 1)
-                else:
-                    col = random.randint(0, self.grid_size - 1)
-                    row = random.randint(0, self.grid_size - length)
-
-                new_boat = Boat(row, col, length, is_horizontal, False, color)
-                new_cells = set(new_boat.get_cells())
-                overlaps = False
-                for existing in self.boats:
-                    if new_cells & set(existing.get_cells()):
-                        overlaps = True
-                        break
-                if not overlaps:
-                    self.boats.append(new_boat)
-            
-            # Check solvability
-            if self.is_solvable(self.boats, self.grid_size, self.exit_row):
-                break
-            # If not solvable and it was the last attempt, we keep it anyway but log it
-            if gen_attempt == max_gen_attempts - 1:
-                print("Warning: Could not guarantee solvability after 5 attempts")
+        self.grid_occupancy = 0
+        for boat in self.boats:
+            self.grid_occupancy |= boat.mask
 
         # Reset counters
         self.move_count = 0
         self.start_time = time.ticks_ms()
+        self.shown_seconds = -1
         self.game_won = False
-        self.moves_label.set_text("Moves\n0")
+        self._update_moves_label()
         self.win_panel_container.add_flag(lv.obj.FLAG.HIDDEN)
 
         # Create images for boats
@@ -549,108 +705,266 @@ class QuasiBoats(Activity):
             f"New game: seed {seed}, {len(self.boats)} boats, cell_size {self.cell_size}"
         )
 
-    def create_boat_images(self):
-        """Create LVGL images for all boats"""
-        focusgroup = lv.group_get_default()
+    def _new_seed(self):
+        """Return a fresh random puzzle seed"""
+        # _generate_boats() leaves random seeded with the last puzzle seed, so reseed from
+        # the clock first or every seed would follow from the one before it
+        random.seed(time.ticks_us() ^ self.wave_rng)
+        return random.randint(1, 999999)
+
+    def _generate_boats(self, seed):
+        """Generator for the boats of puzzle seed, moved to the hardest start found for them
+
+        Yields between chunks of the search and returns the boats, see _run_steps().
+        """
+        # Only locals from here on, a job from prepare_next_game() may still be running after
+        # the grid size changed
+        grid_size = self.grid_size
+        exit_row = grid_size // 2
+
+        # The current puzzle is known already, build its start again
+        start_layout = self.start_layout
+        if start_layout and start_layout[0] == grid_size and start_layout[1] == seed:
+            boats = []
+            for row, col, length, is_horizontal in start_layout[2]:
+                if boats:
+                    boats.append(Boat(row, col, length, is_horizontal, grid_size, False, "white"))
+                else:
+                    boats.append(Boat(row, col, length, is_horizontal, grid_size, True, "red"))
+            return boats
+
+        # Generate puzzle backwards from the solved position
+        # Larger grids branch more, so their search needs more states to get as deep
+        max_states = max(500, 100 * grid_size)
+        min_moves = self.MIN_START_MOVES[grid_size]
+        best = None # (moves, start state, boats) of the hardest layout tried
+        max_gen_attempts = 5
+        for gen_attempt in range(max_gen_attempts):
+            # Seed every layout on its own, random may be used elsewhere while the search yields
+            random.seed(seed + gen_attempt * 1000000)
 
-        for boat in self.boats:
-            if boat.is_player:
-                # Player boat is always length 2, load horizontal asset
-                src = f"{self.ASSET_PATH}player_h2.png"
+            # Create player boat at the exit, the start position is found below
+            player_col = grid_size - 2 # Player boat is always length 2
+            player_boat = Boat(exit_row, player_col, 2, True, grid_size, True, "red")
+            boats = [player_boat]
+
+            # Generate obstacle yachts
+            num_obstacles = min(grid_size + 1, 10)
+            boats.extend(self._place_yachts(player_boat.mask, num_obstacles - 1, grid_size, exit_row))
+
+            # Walk back from the solved position to the hardest start we can reach, a
+            # layout that only allows easy starts is swapped for a new one
+            found = yield from self.find_start_state(boats, grid_size, max_states)
+            if found and (best is None or found[0] > best[0]):
+                best = (found[0], found[1], boats)
+                if found[0] >= min_moves:
+                    break
+        if best is None:
+            # The player boat can't leave the exit in any layout, keep the last one solved
+            print("Warning: Could not move the player boat away from the exit after 5 attempts")
+            state = None
+        else:
+            moves, state, boats = best
+
+        if state is not None:
+            for i in range(len(boats)):
+                boat = boats[i]
+                if boat.is_horizontal:
+                    boat.move_to(boat.row, state[i])
+                else:
+                    boat.move_to(state[i], boat.col)
+        return boats
+
+    def prepare_next_game(self):
+        """Generator for the next random puzzle, so on_new_game doesn't wait for it
+
+        update_frame() steps it once per frame, next_game is set when it finishes.
+        """
+        grid_size = self.grid_size
+        seed = self._new_seed()
+        boats = yield from self._generate_boats(seed)
+        self.next_game = (grid_size, seed, boats)
+
+    @staticmethod
+    def _run_steps(steps):
+        """Run a generator such as _generate_boats() to the end and return its result"""
+        try:
+            while True:
+                next(steps)
+        except StopIteration as e:
+            return e.value
+
+    def _place_yachts(self, placed_mask, count, grid_size, exit_row):
+        """Return up to count random yachts placed on the free cells of placed_mask
+
+        Each yacht picks its shape at random and then one of the positions where
+        that shape fits, so no draws are wasted on overlapping positions.
+        Positions that would pin the cell left of the player boat are skipped too,
+        the player could never leave the exit and the layout would be thrown away.
+        """
+        stride = Boat.MASK_STRIDE
+        # Cell the player boat has to move into first, on the exit row
+        exit_bit = 1 << (exit_row * stride + grid_size - 3)
+        getrandbits = random.getrandbits
+        randint = random.randint
+        yachts = []
+        for _ in range(count):
+            # Only use lengths 2 and 3 for yachts, one draw gives both the length and orientation
+            shape_bits = getrandbits(2)
+            length = 2 + (shape_bits & 1)
+            is_horizontal = shape_bits & 2 != 0
+
+            if is_horizontal:
+                shape = (1 << length) - 1
+                rows = grid_size
+                cols = grid_size - length + 1
+                # On the exit row it must fit left of that cell to ever clear it
+                can_clear = length <= grid_size - 3
             else:
-                # Yachts are length 2 or 3, and always white, load horizontal asset
-                src = f"{self.ASSET_PATH}yacht_white_h{boat.length}.png"
+                shape = Boat.COLUMN_RUNS[length]
+                rows = grid_size - length + 1
+                cols = grid_size
+                # Crossing the exit row it must fit above or below it to ever clear it
+                can_clear = length <= exit_row or length <= grid_size - 1 - exit_row
+            blocked_mask = placed_mask if can_clear else placed_mask | exit_bit
+
+            # Bit offsets (row * stride + col) of every position the yacht fits at
+            free = []
+            for row in range(rows):
+                for offset in range(row * stride, row * stride + cols):
+                    if not blocked_mask & (shape << offset):
+                        free.append(offset)
+            if not free:
+                continue
 
-            img = lv.image(self.grid_container)
-            img.set_src(src)
+            offset = free[randint(0, len(free) - 1)]
+            placed_mask |= shape << offset
+            # Only use white yachts
+            yachts.append(Boat(offset // stride, offset % stride, length, is_horizontal, grid_size, False, "white"))
+        return yachts
 
-            # Scale image to fit cell size (assets are 40px)
-            scale = (self.cell_size * 256) // 40
+    def create_boat_images(self):
+        """Show an LVGL image for each boat, reusing the images of earlier games"""
+        scale = self.img_scale
+        cell_px = self.cell_px
+        boat_by_img = self.boat_by_img
+        boat_imgs = self.boat_imgs
+        hidden = lv.obj.FLAG.HIDDEN
+
+        for i in range(len(self.boats)):
+            boat = self.boats[i]
+            if i < len(boat_imgs):
+                img = boat_imgs[i]
+                img.remove_flag(hidden)
+                # Drop any outline left over from the boat that used this image before
+                img.set_style_outline_width(0, 0)
+            else:
+                img = self._create_boat_image()
+                boat_imgs.append(img)
+            img.set_src(self._get_boat_src(boat))
             img.set_scale(scale)
 
             # Set initial position
-            x = boat.col * self.cell_size
-            y = boat.row * self.cell_size
+            x = cell_px[boat.col]
+            y = cell_px[boat.row]
 
             if boat.is_horizontal:
-                img.set_size(boat.length * self.cell_size, self.cell_size)
-                img.set_pos(x, y)
+                img.set_size(cell_px[boat.length], cell_px[1])
             else:
-                # For vertical boats: set the image object's bounding box to vertical dimensions.
-                img.set_size(self.cell_size, boat.length * self.cell_size)
-                # Set the pivot to the center of this new, vertical bounding box.
-                # img.set_pivot(self.cell_size // 2, (boat.length * self.cell_size) // 2)
-                # Rotate the image content by 90 degrees clockwise.
-                img.set_rotation(900) # LVGL uses tenths of a degree
-                # Set the position of the top-left corner of this new, vertical bounding box.
-                img.set_pos(x, y)
-
-
-            # Make draggable and focusable
-            img.add_flag(lv.obj.FLAG.CLICKABLE)
-            img.add_event_cb(
-                lambda e, b=boat: self.on_boat_pressed(e, b), lv.EVENT.PRESSED, None
-            )
-            img.add_event_cb(
-                lambda e, b=boat: self.on_boat_pressing(e, b), lv.EVENT.PRESSING, None
-            )
-            img.add_event_cb(
-                lambda e, b=boat: self.on_boat_released(e, b), lv.EVENT.RELEASED, None
-            )
-            img.add_event_cb(
-                lambda e, b=boat: self.on_boat_focused(e, b), lv.EVENT.FOCUSED, None
-            )
-            img.add_event_cb(
-                lambda e, b=boat: self.on_boat_defocused(e, b), lv.EVENT.DEFOCUSED, None
-            )
-            img.add_event_cb(
-                lambda e, b=boat: self.on_boat_key(e, b), lv.EVENT.KEY, None
-            ) # Add key event handler to boat
-
-            if focusgroup:
-                focusgroup.add_obj(img)
+                img.set_size(cell_px[1], cell_px[boat.length])
+            img.set_pos(x, y)
 
+            boat_by_img[img] = boat
             boat.img = img
 
+        # Hide the images this game doesn't need, hidden objects are skipped by focus too
+        for i in range(len(self.boats), len(boat_imgs)):
+            boat_imgs[i].add_flag(hidden)
+
+        # A focused image keeps its focus but now shows another boat, or none, and no
+        # FOCUSED event fires for that, so select its new boat or hand focus back to the screen
+        focus_group = self.focus_group
+        if focus_group:
+            focused = focus_group.get_focused()
+            boat = boat_by_img.get(focused)
+            if boat:
+                self.on_boat_focused(None, boat)
+            elif focused in boat_imgs:
+                self.move_locked = False
+                focus_group.set_editing(False)
+                self.clear_drag_dots()
+                InputManager.emulate_focus_obj(focus_group, self.screen)
+
+    def _create_boat_image(self):
+        """Create a draggable, focusable boat image with the shared event callbacks"""
+        img = lv.image(self.grid_container)
+        img.add_flag(lv.obj.FLAG.CLICKABLE)
+        for callback, code in self.boat_event_cbs:
+            img.add_event_cb(callback, code, None)
+
+        if self.focus_group:
+            self.focus_group.add_obj(img)
+        # Keep the drag dots drawn above the boats
+        for dot in self.drag_dots:
+            dot.move_foreground()
+        return img
+
+    def _boat_event_cb(self, handler):
+        """Wrap a handler(event, boat) as an LVGL callback that looks up the boat"""
+        def callback(event):
+            boat = self.boat_by_img.get(event.get_current_target_obj())
+            if boat:
+                handler(event, boat)
+
+        return callback
+
+    def _get_boat_src(self, boat):
+        """Return the image path for a boat, building each distinct path only once"""
+        key = (boat.is_player, boat.is_horizontal, boat.length)
+        src = self.boat_srcs.get(key)
+        if src is None:
+            if boat.is_player:
+                # Player boat is always length 2, load horizontal asset
+                src = self.ASSET_PATH + "player_h2.png"
+            elif boat.is_horizontal:
+                # Yachts are length 2 or 3, and always white
+                src = self.ASSET_PATH + "yacht_white_h%d.png" % boat.length
+            else:
+                # Pre-rotated asset, so LVGL blits it without the rotation path
+                src = self.ASSET_PATH + "yacht_white_v%d.png" % boat.length
+            self.boat_srcs[key] = src
+        return src
+
     def on_boat_key(self, event, boat):
         """Handle key events for individual boats"""
         key = event.get_key()
-        print(f"on_boat_key: Key {key} pressed for boat at ({boat.row}, {boat.col}), move_locked: {self.move_locked}")
-        if key == lv.KEY.ENTER or key == ord("A") or key == ord("a"):
+        if DEBUG:
+            print(f"on_boat_key: Key {key} pressed for boat at ({boat.row}, {boat.col}), move_locked: {self.move_locked}")
+        if key in self.lock_keys:
             # First, set the editing mode based on the *new* move_locked state
             new_move_locked_state = not self.move_locked
-            lv.group_get_default().set_editing(new_move_locked_state)
+            self.focus_group.set_editing(new_move_locked_state)
             
             # Then, toggle the move_locked state
             self.move_locked = new_move_locked_state
             
             self._update_boat_drag_visuals(boat)
-            print(f"on_boat_key: move_locked toggled to {self.move_locked}")
+            if DEBUG:
+                print(f"on_boat_key: move_locked toggled to {self.move_locked}")
             event.stop_bubbling() # Stop event from propagating to screen
             return
         
-        if self.move_locked:
-            if key == lv.KEY.UP:
-                self.move_selected_boat("up")
-                InputManager.emulate_focus_obj(lv.group_get_default(), boat.img) # Re-focus the boat after moving
-                event.stop_bubbling()
-            elif key == lv.KEY.DOWN:
-                self.move_selected_boat("down")
-                InputManager.emulate_focus_obj(lv.group_get_default(), boat.img) # Re-focus the boat after moving
-                event.stop_bubbling()
-            elif key == lv.KEY.LEFT:
-                self.move_selected_boat("left")
-                InputManager.emulate_focus_obj(lv.group_get_default(), boat.img) # Re-focus the boat after moving
-                event.stop_bubbling()
-            elif key == lv.KEY.RIGHT:
-                self.move_selected_boat("right")
-                InputManager.emulate_focus_obj(lv.group_get_default(), boat.img) # Re-focus the boat after moving
-                event.stop_bubbling()
+        delta = self.key_deltas.get(key)
+        if delta and self.move_locked:
+            self.move_selected_boat(delta[0], delta[1])
+            InputManager.emulate_focus_obj(self.focus_group, boat.img) # Re-focus the boat after moving
+            event.stop_bubbling()
         # If not move_locked, let the event bubble up for focus navigation (no else needed)
 
     def on_boat_focused(self, event, boat):
         """Highlight boat when focused with keyboard"""
-        print(f"on_boat_focused: Boat at ({boat.row}, {boat.col}) focused")
+        if DEBUG:
+            print(f"on_boat_focused: Boat at ({boat.row}, {boat.col}) focused")
         self.selected_boat = boat
         boat.selected = True
         # Update visuals based on current move_locked state
@@ -658,7 +972,8 @@ class QuasiBoats(Activity):
 
     def on_boat_defocused(self, event, boat):
         """Remove highlight when focus lost"""
-        print(f"on_boat_defocused: Boat at ({boat.row}, {boat.col}) defocused")
+        if DEBUG:
+            print(f"on_boat_defocused: Boat at ({boat.row}, {boat.col}) defocused")
         # If move_locked is True, we want the boat to remain visually focused.
         # Do not clear visuals or change editing mode.
         if self.move_locked:
@@ -666,7 +981,7 @@ class QuasiBoats(Activity):
         
         boat.selected = False
         self.clear_drag_dots()
-        boat.img.set_style_outline_width(0, 0)
+        self._set_boat_outline(boat, None)
         # The editing mode is managed by on_boat_key when move_locked changes.
 
     def on_boat_pressed(self, event, boat):
@@ -678,10 +993,12 @@ class QuasiBoats(Activity):
         self.dragging_boat = boat
         boat.drag_start_row = boat.row
         boat.drag_start_col = boat.col
+        self.drag_indev = lv.indev_active()
+        # Only this boat moves during the drag, so its free range stays valid until release
+        boat.drag_min, boat.drag_max = boat.get_move_range(self.grid_occupancy)
 
         # Visual feedback
-        boat.img.set_style_outline_width(3, 0)
-        boat.img.set_style_outline_color(lv.color_hex(0xF39C12), 0)
+        self._set_boat_outline(boat, 0xF39C12)
         self._update_boat_drag_visuals(boat) # Show dots on press
 
     def on_boat_pressing(self, event, boat):
@@ -690,41 +1007,37 @@ class QuasiBoats(Activity):
         if not self.dragging_boat or self.game_won or self.move_locked:
             return
 
-        # Get touch position relative to grid
-        indev = lv.indev_active()
-        point = lv.point_t()
-        indev.get_point(point)
-
-        # Convert to grid coordinates
-        grid_x = point.x - self.grid_offset_x
-        grid_y = point.y - self.grid_offset_y
+        # Get touch position relative to grid, reusing the drag's indev and one point_t
+        point = self.indev_point
+        self.drag_indev.get_point(point)
 
-        new_col = grid_x // self.cell_size
-        new_row = grid_y // self.cell_size
-
-        # Constrain movement to boat's orientation
-        if boat.is_horizontal:
-            new_row = boat.row  # Lock row
-        else:
-            new_col = boat.col  # Lock column
-
-        # Clamp to grid bounds
-        new_row = max(0, min(new_row, self.grid_size - 1))
+        # Convert only the boat's own axis to grid coordinates, the other one is locked,
+        # and clamp it to the grid bounds
+        new_row = boat.row
+        new_col = boat.col
         if boat.is_horizontal:
-            new_col = max(0, min(new_col, self.grid_size - boat.length))
+            new_pos = (point.x - self.grid_offset_x) // self.cell_size
+            new_pos = max(0, min(new_pos, boat.max_start))
+            # Most drag events stay within the same cell
+            if new_pos == new_col:
+                return
+            new_col = new_pos
         else:
-            new_col = max(0, min(new_col, self.grid_size - 1))
-
-        # Check if valid move (prevents passing through other boats)
-        if boat.can_move_to(new_row, new_col, self.grid_size, self.boats):
+            new_pos = (point.y - self.grid_offset_y) // self.cell_size
+            new_pos = max(0, min(new_pos, self.grid_size - 1))
+            if new_pos == new_row:
+                return
+            new_row = new_pos
+
+        # Check if valid move (prevents passing through other boats), any position
+        # outside the free range found on press is blocked
+        if boat.drag_min <= new_pos <= boat.drag_max:
             # Update boat position in model
-            boat.row = new_row
-            boat.col = new_col
-            
+            self._move_boat(boat, new_row, new_col)
+
             # Update visual position
-            x = new_col * self.cell_size
-            y = new_row * self.cell_size
-            boat.img.set_pos(x, y)
+            cell_px = self.cell_px
+            boat.img.set_pos(cell_px[new_col], cell_px[new_row])
             self._update_boat_drag_visuals(boat) # Update dots during dragging
 
     def on_boat_released(self, event, boat):
@@ -736,9 +1049,11 @@ class QuasiBoats(Activity):
         x = boat.img.get_x()
         y = boat.img.get_y()
 
-        # Snap to grid
-        new_col = round(x / self.cell_size)
-        new_row = round(y / self.cell_size)
+        # Snap to the nearest cell in integer math (image positions are never negative)
+        cell_size = self.cell_size
+        half_cell = cell_size // 2
+        new_col = (x + half_cell) // cell_size
+        new_row = (y + half_cell) // cell_size
 
         # Constrain to boat orientation
         if boat.is_horizontal:
@@ -746,90 +1061,83 @@ class QuasiBoats(Activity):
         else:
             new_col = boat.col
 
-        # Check if valid final position
-        if boat.can_move_to(new_row, new_col, self.grid_size, self.boats):
-            # Check if boat actually moved
-            if new_row != boat.drag_start_row or new_col != boat.drag_start_col:
-                boat.row = new_row
-                boat.col = new_col
-                self.move_count += 1
-                self.moves_label.set_text(f"Moves\n{self.move_count}")
-
-                # Check win condition
-                if (
-                    boat.is_player
-                    and boat.row == self.exit_row
-                    and boat.col + boat.length >= self.grid_size
-                ):
-                    self.on_win()
-        else:
-            # Invalid position - snap back to start
-            new_row = boat.drag_start_row
-            new_col = boat.drag_start_col
-            boat.row = new_row
-            boat.col = new_col
-
-        # Snap to grid visually
-        x = new_col * self.cell_size
-        y = new_row * self.cell_size
-        boat.img.set_pos(x, y)
-
-        # Update visual feedback
-        self._update_boat_drag_visuals(boat)
+        # The drag keeps the model on the image's cell, so the snapped cell is normally
+        # where the boat already is and needs neither a check nor a model update
+        if new_row != boat.row or new_col != boat.col:
+            # Check if valid final position
+            if not boat.can_move_to(new_row, new_col, self.grid_size, self.grid_occupancy):
+                # Invalid position - snap back to start
+                new_row = boat.drag_start_row
+                new_col = boat.drag_start_col
+            self._move_boat(boat, new_row, new_col)
+
+        # Check if boat actually moved
+        if new_row != boat.drag_start_row or new_col != boat.drag_start_col:
+            self.move_count += 1 # Shown by update_frame
+
+            # Check win condition (the player boat can only move along the exit row)
+            if boat.is_player and boat.col >= self.win_col:
+                self.on_win()
+
+        # Snap to grid visually, the drag usually left the image there already
+        snap_x = self.cell_px[new_col]
+        snap_y = self.cell_px[new_row]
+        if snap_x != x or snap_y != y:
+            boat.img.set_pos(snap_x, snap_y)
 
         self.dragging_boat = None
+        self.drag_indev = None
         self._update_boat_drag_visuals(boat) # Clear dots on release
 
-    def move_selected_boat(self, direction):
-        """Move selected boat with keyboard (only when Enter/A is held)"""
-        print(f"move_selected_boat: Direction {direction}, move_locked: {self.move_locked}")
+    def _move_boat(self, boat, row, col):
+        """Move a boat in the model and keep grid_occupancy in sync"""
+        self.grid_occupancy ^= boat.mask
+        boat.move_to(row, col)
+        self.grid_occupancy |= boat.mask
+
+    def move_selected_boat(self, d_row, d_col):
+        """Move selected boat one cell by (d_row, d_col) with keyboard (only when Enter/A is held)"""
+        if DEBUG:
+            print(f"move_selected_boat: Delta ({d_row}, {d_col}), move_locked: {self.move_locked}")
         if not self.selected_boat or self.game_won or not self.move_locked:
-            print("move_selected_boat: Conditions not met for movement")
+            if DEBUG:
+                print("move_selected_boat: Conditions not met for movement")
             return
 
         boat = self.selected_boat
-        new_row = boat.row
-        new_col = boat.col
-
-        if direction == "up" and not boat.is_horizontal:
-            new_row -= 1
-        elif direction == "down" and not boat.is_horizontal:
-            new_row += 1
-        elif direction == "left" and boat.is_horizontal:
-            new_col -= 1
-        elif direction == "right" and boat.is_horizontal:
-            new_col += 1
-        else:
+        # Boats only move along their own axis
+        if (d_row == 0) != boat.is_horizontal:
             return
+        new_row = boat.row + d_row
+        new_col = boat.col + d_col
 
-        if boat.can_move_to(new_row, new_col, self.grid_size, self.boats):
-            boat.row = new_row
-            boat.col = new_col
+        if boat.can_move_to(new_row, new_col, self.grid_size, self.grid_occupancy):
+            self._move_boat(boat, new_row, new_col)
 
-            x = new_col * self.cell_size
-            y = new_row * self.cell_size
+            x = self.cell_px[new_col]
+            y = self.cell_px[new_row]
             boat.img.set_pos(x, y)
 
-            self.move_count += 1
-            self.moves_label.set_text(f"Moves\n{self.move_count}")
+            self.move_count += 1 # Shown by update_frame
 
-            if (
-                boat.is_player
-                and boat.row == self.exit_row
-                and boat.col + boat.length >= self.grid_size
-            ):
+            if boat.is_player and boat.col >= self.win_col:
                 self.on_win()
 
+    def _update_moves_label(self):
+        """Show move_count, only touching the label when the shown count changes"""
+        if self.move_count != self.shown_moves:
+            self.shown_moves = self.move_count
+            self.moves_label.set_text(self.MOVES_FORMAT % self.move_count)
+
     def on_win(self):
         """Handle winning the puzzle"""
         self.game_won = True
         elapsed = time.ticks_diff(time.ticks_ms(), self.start_time) // 1000
 
-        minutes = elapsed // 60
-        seconds = elapsed % 60
+        minutes, seconds = divmod(elapsed, 60)
 
         self.win_label.set_text(
-            f"You Win!\n{self.move_count} moves\n{minutes}:{seconds:02d}"
+            f"You Win!\n{self.move_count} moves\n" + self.TIME_FORMAT % (minutes, seconds)
         )
         self.win_panel_container.remove_flag(lv.obj.FLAG.HIDDEN)
 
@@ -844,41 +1152,30 @@ class QuasiBoats(Activity):
         self.new_game()
 
     def recreate_grid(self):
-        """Recreate the grid with new size"""
-        # Delete old containers
-        if self.grid_container:
-            self.grid_container.delete()
-        if self.win_panel_container:
-            self.win_panel_container.delete()
-        if self.info_panel_container:
-            self.info_panel_container.delete()
-
-        # Clear boat list
-        self.boats = []
-
-        # Recreate grid container with new cell size
-        grid_pixel_size = self.grid_size * self.cell_size + 4
+        """Resize the grid for the new grid size"""
+        # Only the grid depends on the cell size, the container, panels and labels are kept
+        # Drag dots belong to the old layout
+        self.clear_drag_dots()
+        self._size_drag_dots()
 
-        
-        self._create_grid_container(grid_pixel_size)
-        self._create_exit_marker()
+        # Resize grid container for the new cell size
+        grid_pixel_size = self.grid_size * self.cell_size + 4
+        self.grid_container.set_size(grid_pixel_size, grid_pixel_size)
+        self._place_exit_marker()
 
-        # Recreate info panel container and labels
+        # Move the info panel next to the resized grid
         right_panel_content_size = self.grid_size * self.cell_size
         right_panel_x = self.grid_offset_x + right_panel_content_size + 5
+        self.info_panel_container.set_pos(right_panel_x, 5)
 
-        self._create_info_panel_container(right_panel_x)
+        # Re-center the win panel on the resized grid
+        self.win_panel_container.align_to(self.grid_container, lv.ALIGN.CENTER, 0, 0)
 
-        self._create_info_panel_labels(self.info_panel_container)
-        self._create_win_label(self.grid_container)
-        # Re-initialize labels after recreation
-        self.moves_label.set_text(f"Moves\n{self.move_count}")
-        elapsed = time.ticks_diff(time.ticks_ms(), self.start_time) // 1000
-        minutes = elapsed // 60
-        seconds = elapsed % 60
-        self.time_label.set_text(f"{minutes}:{seconds:02d}")
+        # A puzzle prepared or half generated for the old grid size is no use now
+        self.next_game = None
+        self.next_game_steps = None
 
-        # Start new game
+        # Start new game (resizes the boat images, resets the move and time labels)
         self.new_game()
 
     def _create_grid_container(self, grid_pixel_size):
@@ -895,213 +1192,353 @@ class QuasiBoats(Activity):
 
     def _create_exit_marker(self):
         """Create the exit marker and arrow label"""
-        self.exit_row = self.grid_size // 2
-        exit_marker = lv.obj(self.grid_container)
-        hori_multiplier = 0.3
-        exit_marker.set_size(int(self.cell_size*hori_multiplier), self.cell_size)
-        exit_marker.set_pos(
-            (self.grid_size - 1) * self.cell_size + int(self.cell_size*(1-hori_multiplier)), self.exit_row * self.cell_size
-        )
-        exit_marker.set_style_bg_color(lv.color_hex(self.wood_bg_color), 0)
-        exit_marker.set_style_border_color(lv.color_hex(self.wood_border_color), 0)
-        exit_marker.set_style_border_width(2, 0)
-        # exit_marker.set_style_radius(0, 0)
-        # exit_marker.set_style_border_width(4, 0)
-        exit_marker.set_scrollbar_mode(lv.SCROLLBAR_MODE.OFF)
-        exit_marker.remove_flag(lv.obj.FLAG.SCROLLABLE)
-
-        arrow_label = lv.label(self.grid_container)
-        arrow_label.set_size(self.cell_size, self.cell_size)
-        print(f"cell size {self.cell_size}")
-        arrow_label.set_text(lv.SYMBOL.RIGHT)
-        arrow_label.set_style_text_color(lv.color_hex(0xFFD700), 0)
+        self.exit_marker = lv.obj(self.grid_container)
+        self.exit_marker.set_style_bg_color(self.wood_bg, 0)
+        self.exit_marker.set_style_border_color(self.wood_border, 0)
+        self.exit_marker.set_style_border_width(2, 0)
+        # self.exit_marker.set_style_radius(0, 0)
+        # self.exit_marker.set_style_border_width(4, 0)
+        self.exit_marker.set_scrollbar_mode(lv.SCROLLBAR_MODE.OFF)
+        self.exit_marker.remove_flag(lv.obj.FLAG.SCROLLABLE)
+
+        self.exit_arrow = lv.label(self.grid_container)
+        self.exit_arrow.set_text(lv.SYMBOL.RIGHT)
+        self.exit_arrow.set_style_text_color(lv.color_hex(0xFFD700), 0)
        
-        arrow_label.set_style_text_font(lv.font_montserrat_24, 0) # Increased font size
-        arrow_label.set_pos(
-            (self.grid_size - 1) * self.cell_size, (self.exit_row * self.cell_size) + (round((self.cell_size/2)- 13))
-        )
+        self.exit_arrow.set_style_text_font(lv.font_montserrat_24, 0) # Increased font size
+        self._place_exit_marker()
+
+    def _place_exit_marker(self):
+        """Size and position the exit marker and arrow for the current grid"""
+        self.exit_row = self.grid_size // 2
+        cell_size = self.cell_size
+        # Marker is a 30% wide strip at the right of the last cell on the exit row,
+        # in integer math instead of float multiplies
+        exit_x = self.cell_px[self.grid_size - 1]
+        exit_y = self.cell_px[self.exit_row]
+        self.exit_marker.set_size(cell_size * 3 // 10, cell_size)
+        self.exit_marker.set_pos(exit_x + cell_size * 7 // 10, exit_y)
+
+        self.exit_arrow.set_size(cell_size, cell_size)
+        if DEBUG:
+            print(f"cell size {cell_size}")
+        self.exit_arrow.set_pos(exit_x, exit_y + round(cell_size / 2 - 13))
     
 
 
     def on_key(self, event):
         """Handle keyboard input"""
-        key = event.get_key()
         # Don't process game keys if menu is open
-        if self.menu_modal:
+        if self.menu_open:
             return
-        # Arrow keys move boat when locked
         # Arrow keys move boat when locked (handled by boat's on_boat_key)
-        elif key == ord("R") or key == ord("r"):
-            self.on_reset(event)
-        elif key == ord("N") or key == ord("n"):
-            self.on_new_game(event)
-        elif key == ord("M") or key == ord("m"):
-            self.show_menu(event)
-
-    def update_frame(self, timer):
+        action = self.key_actions.get(event.get_key())
+        if action:
+            action(event)
+
+    def update_frame(self, timer, ticks_ms=time.ticks_ms, ticks_diff=time.ticks_diff):
         """Main game loop - update timer and check key state"""
-        current_time = time.ticks_ms()
-        # Calculate delta_time in seconds
-        delta_time = (current_time - self.last_update_time) / 1000.0
+        # ticks_ms/ticks_diff are bound once as default args, attributes below are cached as
+        # locals, since MicroPython resolves globals and attributes on every access
+        current_time = ticks_ms()
+        # Keep the frame delta in integer milliseconds to avoid a float per frame
+        delta_ms = ticks_diff(current_time, self.last_update_time)
         self.last_update_time = current_time
 
         if not self.game_won:
-            elapsed = time.ticks_diff(time.ticks_ms(), self.start_time) // 1000
-            minutes = elapsed // 60
-            seconds = elapsed % 60
-            self.time_label.set_text(f"{minutes}:{seconds:02d}")
-
-        # Animate waves
-        for wave in self.waves:
-            wave["x"] += self.wave_speed * wave["speed_multiplier"] * delta_time
+            elapsed = ticks_diff(current_time, self.start_time) // 1000
+            # Only touch the label when the shown second changes, set_text invalidates it
+            if elapsed != self.shown_seconds:
+                self.shown_seconds = elapsed
+                minutes, seconds = divmod(elapsed, 60)
+                self.time_label.set_text(self.TIME_FORMAT % (minutes, seconds))
+
+        # Moves of a key repeat burst are shown once per frame, not once per key
+        self._update_moves_label()
+
+        # Animate waves in fixed point so no floats are allocated per wave
+        shift = self.WAVE_SHIFT
+        max_x = self.SCREEN_WIDTH << shift
+        screen_height = self.SCREEN_HEIGHT
+        rng = self.wave_rng
+        wave_objs = self.wave_objs
+        wave_x = self.wave_x
+        wave_px = self.wave_px
+        wave_y = self.wave_y
+        wave_widths = self.wave_widths
+        wave_speeds = self.wave_speeds
+        for i in range(len(wave_objs)):
+            x = wave_x[i] + wave_speeds[i] * delta_ms
             # If wave goes off screen to the right, reset its position to the left
-            if wave["x"] > self.SCREEN_WIDTH:
-                wave["x"] = -wave["width"]
-                wave["y"] = random.randint(0, self.SCREEN_HEIGHT) # Randomize y position
-            wave["obj"].set_pos(int(wave["x"]), int(wave["y"]))
+            if x > max_x:
+                x = -wave_widths[i] << shift
+                # Randomize y position with an inline xorshift16, it stays within small ints
+                # and leaves the seeded puzzle generator alone
+                rng ^= (rng << 7) & 0xFFFF
+                rng ^= rng >> 9
+                rng ^= (rng << 8) & 0xFFFF
+                wave_y[i] = rng % (screen_height + 1)
+            wave_x[i] = x
+            # Skip the LVGL invalidation until the wave has moved a whole pixel
+            px = x >> shift
+            if px != wave_px[i]:
+                wave_px[i] = px
+                wave_objs[i].set_pos(px, wave_y[i])
+        self.wave_rng = rng
+
+        # Generate the next puzzle once this one has been up for a second, one step per
+        # frame, not mid-drag or while the menu may still change the grid size
+        if (self.next_game is None and not self.dragging_boat and not self.menu_open
+                and ticks_diff(current_time, self.start_time) > 1000):
+            if self.next_game_steps is None:
+                self.next_game_steps = self.prepare_next_game()
+            try:
+                next(self.next_game_steps)
+            except StopIteration:
+                self.next_game_steps = None
 
-        # Check if Enter/A key is released
         # Check if Enter/A key is released (only if not handled by boat directly)
-        # This is a fallback for when the boat doesn't consume the event
-        indev = lv.indev_active()
-        if indev and indev.get_type() == lv.INDEV_TYPE.KEYPAD:
-            if not indev.get_key(): # No key is currently pressed
-                if self.move_locked:
+        # This is a fallback for when the boat doesn't consume the event, only needed
+        # while a boat is locked, so the indev isn't queried on every other frame
+        if self.move_locked:
+            indev = lv.indev_active()
+            if indev and indev.get_type() == lv.INDEV_TYPE.KEYPAD:
+                if not indev.get_key(): # No key is currently pressed
                     self.move_locked = False
                     if self.selected_boat:
-                            self._update_boat_drag_visuals(self.selected_boat)
+                        self._update_boat_drag_visuals(self.selected_boat)
 
     def _update_boat_drag_visuals(self, boat):
         """Update boat visual feedback for dragging (red border, dots)"""
-        print(f"_update_boat_drag_visuals: boat at ({boat.row}, {boat.col}), selected: {boat.selected}, move_locked: {self.move_locked}")
+        if DEBUG:
+            print(f"_update_boat_drag_visuals: boat at ({boat.row}, {boat.col}), selected: {boat.selected}, move_locked: {self.move_locked}")
         if boat.selected:
             if self.move_locked:
-                boat.img.set_style_outline_width(3, 0)
-                boat.img.set_style_outline_color(lv.color_hex(0xFF0000), 0)  # Red
+                self._set_boat_outline(boat, 0xFF0000)  # Red
                 self.create_drag_dots(boat)
             else:
-                boat.img.set_style_outline_width(3, 0)
-                boat.img.set_style_outline_color(lv.color_hex(0xFFFFFF), 0)  # White
+                self._set_boat_outline(boat, 0xFFFFFF)  # White
                 self.clear_drag_dots()
         else:
-            boat.img.set_style_outline_width(0, 0)
+            self._set_boat_outline(boat, None)
             self.clear_drag_dots()
 
-    def create_drag_dots(self, boat):
-        """Create dots to indicate possible drag directions"""
-        self.clear_drag_dots()
-
+    def _set_boat_outline(self, boat, color):
+        """Outline the boat image in color (None for no outline), only restyling on change"""
+        if boat.outline_color == color:
+            return
+        boat.outline_color = color
+        if color is None:
+            boat.img.set_style_outline_width(0, 0)
+        else:
+            boat.img.set_style_outline_width(3, 0)
+            boat.img.set_style_outline_color(self._lv_color(color), 0)
+
+    def _create_drag_dots(self):
+        """Create the two drag dots once, create_drag_dots() only moves and shows them"""
+        dots = []
+        for side in range(2):
+            dot = lv.obj(self.grid_container)
+            dot.set_style_radius(lv.RADIUS_CIRCLE, 0)
+            dot.set_style_bg_color(lv.color_hex(0xFF0000), 0) # Red dots
+            dot.add_flag(lv.obj.FLAG.HIDDEN)
+            dots.append(dot)
+        self.drag_dots = tuple(dots)
+        self.shown_dot_masks = [None, None]
+        self._size_drag_dots()
+
+    def _size_drag_dots(self):
+        """Size the drag dots for the current cell size"""
         dot_size = self.cell_size // 4
-        dot_color = lv.color_hex(0xFF0000) # Red dots
+        for dot in self.drag_dots:
+            dot.set_size(dot_size, dot_size)
+
+    def _lv_color(self, color):
+        """Return the lv color for hex color, converting each color only once"""
+        lv_color = self.lv_colors.get(color)
+        if lv_color is None:
+            lv_color = self.lv_colors[color] = lv.color_hex(color)
+        return lv_color
+
+    def create_drag_dots(self, boat):
+        """Show dots to indicate possible drag directions"""
+        cell_size = self.cell_size
+        dot_size = cell_size // 4
+        # Leading dot offset as align_to() got it, rounded away from the boat for odd sizes
+        lead = (-dot_size) // 2
+        offset = dot_size // 2
+        row = boat.row
+        col = boat.col
+        grid_size = self.grid_size
+        occupancy = self.grid_occupancy
+
+        # Dots sit centered on the boat's ends, sticking out by half their size. This is
+        # what aligning them to the boat image would give, worked out from the cells so
+        # LVGL doesn't have to update the layout first.
+        x = self.cell_px[col]
+        y = self.cell_px[row]
+        mid = (cell_size - dot_size) // 2
+        end = self.cell_px[boat.length] - dot_size + offset
 
         if boat.is_horizontal:
-            # Left dot
-            if boat.col > 0 and boat.can_move_to(boat.row, boat.col - 1, self.grid_size, self.boats):
-                dot = lv.obj(self.grid_container)
-                dot.set_size(dot_size, dot_size)
-                dot.set_style_radius(lv.RADIUS_CIRCLE, 0)
-                dot.set_style_bg_color(dot_color, 0)
-                dot.align_to(boat.img, lv.ALIGN.LEFT_MID, -dot_size // 2, 0)
-                self.drag_dots.append(dot)
-
-            # Right dot
-            if boat.col + boat.length < self.grid_size and boat.can_move_to(boat.row, boat.col + 1, self.grid_size, self.boats):
-                dot = lv.obj(self.grid_container)
-                dot.set_size(dot_size, dot_size)
-                dot.set_style_radius(lv.RADIUS_CIRCLE, 0)
-                dot.set_style_bg_color(dot_color, 0)
-                dot.align_to(boat.img, lv.ALIGN.RIGHT_MID, dot_size // 2, 0)
-                self.drag_dots.append(dot)
+            # Left and right dots
+            can_left = boat.can_move_to(row, col - 1, grid_size, occupancy)
+            can_right = boat.can_move_to(row, col + 1, grid_size, occupancy)
+            self._set_drag_dot(0, boat, can_left, x + lead, y + mid)
+            self._set_drag_dot(1, boat, can_right, x + end, y + mid)
         else: # Vertical
-            # Up dot
-            if boat.row > 0 and boat.can_move_to(boat.row - 1, boat.col, self.grid_size, self.boats):
-                dot = lv.obj(self.grid_container)
-                dot.set_size(dot_size, dot_size)
-                dot.set_style_radius(lv.RADIUS_CIRCLE, 0)
-                dot.set_style_bg_color(dot_color, 0)
-                dot.align_to(boat.img, lv.ALIGN.TOP_MID, 0, -dot_size // 2)
-                self.drag_dots.append(dot)
-
-            # Down dot
-            if boat.row + boat.length < self.grid_size and boat.can_move_to(boat.row + 1, boat.col, self.grid_size, self.boats):
-                dot = lv.obj(self.grid_container)
-                dot.set_size(dot_size, dot_size)
-                dot.set_style_radius(lv.RADIUS_CIRCLE, 0)
-                dot.set_style_bg_color(dot_color, 0)
-                dot.align_to(boat.img, lv.ALIGN.BOTTOM_MID, 0, dot_size // 2)
-                self.drag_dots.append(dot)
+            # Up and down dots
+            can_up = boat.can_move_to(row - 1, col, grid_size, occupancy)
+            can_down = boat.can_move_to(row + 1, col, grid_size, occupancy)
+            self._set_drag_dot(0, boat, can_up, x + mid, y + lead)
+            self._set_drag_dot(1, boat, can_down, x + mid, y + end)
+
+    def _set_drag_dot(self, side, boat, show, x, y):
+        """Show the drag dot on one side (0 left/up, 1 right/down) of boat at (x, y), or hide it"""
+        # Boats with the same mask have the same position, so the dot is already in place
+        shown_mask = self.shown_dot_masks[side]
+        if show:
+            if shown_mask != boat.mask:
+                dot = self.drag_dots[side]
+                dot.set_pos(x, y)
+                if shown_mask is None:
+                    dot.remove_flag(lv.obj.FLAG.HIDDEN)
+                self.shown_dot_masks[side] = boat.mask
+        elif shown_mask is not None:
+            self.drag_dots[side].add_flag(lv.obj.FLAG.HIDDEN)
+            self.shown_dot_masks[side] = None
 
     def clear_drag_dots(self):
-        """Delete all active drag dots"""
-        for dot in self.drag_dots:
-            dot.delete()
-        self.drag_dots = []
+        """Hide both drag dots"""
+        for side in range(len(self.drag_dots)):
+            if self.shown_dot_masks[side] is not None:
+                self.drag_dots[side].add_flag(lv.obj.FLAG.HIDDEN)
+                self.shown_dot_masks[side] = None
 
     def _add_focus_style(self, obj):
         """Apply a standard focus highlight to buttons"""
-        obj.set_style_outline_width(2, lv.STATE.FOCUS_KEY)
-        obj.set_style_outline_color(lv.color_hex(0xFFFFFF), lv.STATE.FOCUS_KEY)
-        obj.set_style_outline_opa(255, lv.STATE.FOCUS_KEY)
-
-    def is_solvable(self, boats, grid_size, exit_row):
-        """Simple BFS to check if the player boat can reach the exit"""
-        player_boat = boats[0]
-        target_col = grid_size - player_boat.length
-        start_state = tuple(b.col if b.is_horizontal else b.row for b in boats)
-        queue = [start_state]
-        visited = {start_state}
-        max_states = 500
+        obj.add_style(self.focus_style, lv.STATE.FOCUS_KEY)
+
+    @staticmethod
+    def find_start_state(boats, grid_size, max_states):
+        """Find the hardest start position reachable from the current (solved) layout
+
+        Explores the states reachable from the given boat positions with a BFS,
+        then runs a second BFS back from every explored state that has the player
+        boat at the exit. Moves are reversible, so every explored state is solvable,
+        and the one furthest from any solved state needs the most moves.
+        States are one position value (col if horizontal, else row) per boat,
+        packed 4 bits per boat into one int (boat i at bit 4 * i) so they hash
+        and compare as plain ints. At most max_states states are explored.
+        Returns (unit moves to solve it, hardest state as a tuple), or None if the
+        player boat can never leave the exit. It's a generator that yields after
+        every 32 states each BFS visits, so the search can be spread over frames.
+        """
+        target_col = grid_size - boats[0].length
+        num_boats = len(boats)
+        # Each state keeps its occupied cells as one int with grid_size bits per row, so
+        # 4x4 and 5x5 grids stay within MicroPython small ints.
+        # moves[i][pos] lists the in-bounds unit moves of boat i at pos as
+        # (state step, bit of the cell moved into, bits of the cells moved into and out of),
+        # so the search loop only reads the state and these tables, never the boats.
+        moves = []
+        occupancy = 0
+        start_state = 0
+        for i in range(num_boats):
+            boat = boats[i]
+            length = boat.length
+            bits = []
+            if boat.is_horizontal:
+                position = boat.col
+                bit = 1 << (boat.row * grid_size)
+                step = 1
+            else:
+                position = boat.row
+                bit = 1 << boat.col
+                step = grid_size
+            for n in range(grid_size):
+                bits.append(bit)
+                bit <<= step
+            unit = 1 << (4 * i)
+            boat_moves = []
+            for pos in range(grid_size - length + 1):
+                pos_moves = []
+                if pos > 0:
+                    pos_moves.append((-unit, bits[pos - 1], bits[pos - 1] | bits[pos + length - 1]))
+                if pos + length < grid_size:
+                    pos_moves.append((unit, bits[pos + length], bits[pos + length] | bits[pos]))
+                boat_moves.append(tuple(pos_moves))
+            moves.append(boat_moves)
+            for n in range(position, position + length):
+                occupancy |= bits[n]
+            start_state |= position << (4 * i)
+        states = [start_state]
+        occupancies = [occupancy]
+        index = {start_state: 0}
+        neighbors = []
+        # Bound methods used per explored state, looked up once
+        find_index = index.get
+        add_state = states.append
+        add_occupancy = occupancies.append
+        num_states = 1
         head = 0
-        while head < len(queue) and len(visited) < max_states:
-            state = queue[head]
+        while head < num_states:
+            state = states[head]
+            occupancy = occupancies[head]
             head += 1
-            if state[0] >= target_col:
-                return True
-            for i in range(len(boats)):
-                curr_val = state[i]
-                for step in [-1, 1]:
-                    new_val = curr_val + step
-                    if not self._check_collision_static(i, new_val, state, boats, grid_size):
-                        new_state_list = list(state)
-                        new_state_list[i] = new_val
-                        new_state = tuple(new_state_list)
-                        if new_state not in visited:
-                            visited.add(new_state)
-                            queue.append(new_state)
-        return False
-
-    def _check_collision_static(self, boat_idx, new_val, state, boats, grid_size):
-        """Check collision for BFS solver (static state)"""
-        b = boats[boat_idx]
-        length = b.length
-        is_h = b.is_horizontal
-        r1 = b.row if is_h else new_val
-        c1 = new_val if is_h else b.col
-        if new_val < 0 or new_val + length > grid_size:
-            return True
-        for j in range(len(boats)):
-            if boat_idx == j: continue
-            bj = boats[j]
-            vj = state[j]
-            is_hj = bj.is_horizontal
-            r2 = bj.row if is_hj else vj
-            c2 = vj if is_hj else bj.col
-            l2 = bj.length
-            if is_h == is_hj:
-                if (r1 == r2 if is_h else c1 == c2):
-                    start1, start2 = (c1 if is_h else r1), (c2 if is_hj else r2)
-                    if start1 < start2 + l2 and start2 < start1 + length:
-                        return True
-            else:
-                rh, ch, lh = (r1 if is_h else r2), (c1 if is_h else c2), (length if is_h else l2)
-                rv, cv, lv = (r2 if not is_hj else r1), (c2 if not is_hj else c1), (l2 if not is_hj else length)
-                if rv <= rh < rv + lv and ch <= cv < ch + lh:
-                    return True
-        return False
+            adjacent = []
+            for i in range(num_boats):
+                for step, enter, toggle in moves[i][(state >> (4 * i)) & 0xF]:
+                    # Only the single cell the boat would move into can block it
+                    if occupancy & enter:
+                        continue
+                    new_state = state + step
+                    j = find_index(new_state)
+                    if j is None:
+                        if num_states >= max_states:
+                            continue
+                        j = num_states
+                        num_states += 1
+                        index[new_state] = j
+                        add_state(new_state)
+                        add_occupancy(occupancy ^ toggle)
+                    adjacent.append(j)
+            neighbors.append(adjacent)
+            if not head & 31:
+                yield
+
+        # Distance of every explored state to the nearest solved one
+        distances = [-1] * len(states)
+        queue = []
+        for j in range(len(states)):
+            if states[j] & 0xF >= target_col:
+                distances[j] = 0
+                queue.append(j)
+        best = 0
+        head = 0
+        while head < len(queue):
+            j = queue[head]
+            head += 1
+            for k in neighbors[j]:
+                if distances[k] < 0:
+                    distances[k] = distances[j] + 1
+                    queue.append(k)
+                    best = k
+            if not head & 31:
+                yield
+        if distances[best] == 0:
+            return None
+        state = states[best]
+        return distances[best], tuple((state >> (4 * i)) & 0xF for i in range(num_boats))
 
     def onResume(self, screen):
         """Activity goes foreground"""
-        self.update_timer = lv.timer_create(self.update_frame, 16, None) # max 60 fps = 16ms/frame
+        # Collect the garbage left over from building the UI now, not mid-animation
+        gc.collect()
+        # Waves only move a whole pixel every 1000 // wave_speed ms and the clock only
+        # shows seconds, so a faster timer would mostly find nothing to redraw
+        frame_ms = max(16, 1000 // self.wave_speed)
+        self.update_timer = lv.timer_create(self.update_frame, frame_ms, None)
 
     def onPause(self, screen):
         """Activity goes background"""
@@ -1109,4 +1546,5 @@ class QuasiBoats(Activity):
         if self.update_timer:
             self.update_timer.delete()
             self.update_timer = None
+        self.save_prefs()
 
@@ -7,6 +7,9 @@ import math
 os.makedirs('res/mipmap-mdpi', exist_ok=True)
 os.makedirs('assets', exist_ok=True)
 
+# PNG encoder settings, QB_FAST_ASSETS=1 saves with fast zlib while iterating on sprites
+PNG_OPTS = {'compress_level': 1} if os.environ.get('QB_FAST_ASSETS') == '1' else {'optimize': True}
+
 # 1. Create app icon (64x64)
 img = Image.new('RGBA', (64, 64), (0, 0, 0, 0))
 draw = ImageDraw.Draw(img)
@@ -25,7 +28,7 @@ draw.ellipse([(23, 27), (27, 31)], fill='#000000')
 beak = [(32, 36), (46, 36), (39, 42)]
 draw.polygon(beak, fill='#FF6B35', outline='#D84315', width=1)
 
-img.save('res/mipmap-mdpi/icon_64x64.png', 'PNG', optimize=True)
+img.save('res/mipmap-mdpi/icon_64x64.png', 'PNG', **PNG_OPTS)
 print("Icon saved: res/mipmap-mdpi/icon_64x64.png")
 
 # 2. Create bird sprite (32x32)
@@ -46,7 +49,7 @@ draw.ellipse([(10, 12), (12, 14)], fill='#000000')
 beak = [(18, 18), (26, 18), (22, 22)]
 draw.polygon(beak, fill='#FF6B35', outline='#D84315', width=1)
 
-bird.save('assets/bird.png', 'PNG', optimize=True)
+bird.save('assets/bird.png', 'PNG', **PNG_OPTS)
 print("Bird sprite saved: assets/bird.png")
 
 # 2b. Create fire bird sprite (32x32) - for beating highscore
@@ -83,7 +86,7 @@ draw.polygon(crown_left, fill=crown_color, outline='#FF8C00', width=1)
 crown_right = [(19, 4), (17, 8), (21, 8)]
 draw.polygon(crown_right, fill=crown_color, outline='#FF8C00', width=1)
 
-fire_bird.save('assets/fire_bird.png', 'PNG', optimize=True)
+fire_bird.save('assets/fire_bird.png', 'PNG', **PNG_OPTS)
 print("Fire bird sprite saved: assets/fire_bird.png (with crown!)")
 
 # 3. Create pipe sprite (40x200)
@@ -100,12 +103,12 @@ draw.rectangle([(0, 0), (40, 12)], fill='#5CB85C', outline='#449D44', width=2)
 draw.rectangle([(8, 12), (10, 200)], fill='#78C878')
 draw.rectangle([(30, 12), (32, 200)], fill='#449D44')
 
-pipe.save('assets/pipe.png', 'PNG', optimize=True)
+pipe.save('assets/pipe.png', 'PNG', **PNG_OPTS)
 print("Pipe sprite saved: assets/pipe.png")
 
 # Create flipped pipe for top pipes
 pipe_flipped = pipe.transpose(Image.FLIP_TOP_BOTTOM)
-pipe_flipped.save('assets/pipe_top.png', 'PNG', optimize=True)
+pipe_flipped.save('assets/pipe_top.png', 'PNG', **PNG_OPTS)
 print("Flipped pipe sprite saved: assets/pipe_top.png")
 
 # 4. Create wave sprite (tileable pattern)
@@ -121,12 +124,13 @@ def create_wave_tile(
     wave = Image.new('RGBA', (width, height), (0, 0, 0, 0))
     draw = ImageDraw.Draw(wave)
 
-    # Path for the wave crest
-    crest_path = []
-    for x in range(width + 1):
-        # Sine wave for the crest
-        y = height / 2 + (height / 5) * math.sin(2 * math.pi * x / width)
-        crest_path.append((x, y))
+    # Path for the wave crest, a sine wave built in one pass
+    sin = math.sin
+    step = 2 * math.pi / width
+    crest_path = [
+        (x, height / 2 + (height / 5) * sin(step * x))
+        for x in range(width + 1)
+    ]
 
     # Polygon for the filled wave body
     wave_poly = crest_path + [(width, height), (0, height)]
@@ -145,7 +149,7 @@ wave = create_wave_tile(
     height=32,
 )
 
-wave.save('assets/wave.png', 'PNG', optimize=True)
+wave.save('assets/wave.png', 'PNG', **PNG_OPTS)
 print(f"Wave sprite saved: assets/wave.png ({wave.width}x{wave.height} tileable)")
 
 # 5. Create cloud sprite (for parallax scrolling)
@@ -167,7 +171,7 @@ def create_cloud(width=50, height=25):
     return cloud
 
 cloud = create_cloud(width=50, height=25)
-cloud.save('assets/cloud.png', 'PNG', optimize=True)
+cloud.save('assets/cloud.png', 'PNG', **PNG_OPTS)
 print(f"Cloud sprite saved: assets/cloud.png ({cloud.width}x{cloud.height})")
 
 # # 6. Create background (320x240)
@@ -180,7 +184,7 @@ print(f"Cloud sprite saved: assets/cloud.png ({cloud.width}x{cloud.height})")
 #     draw.ellipse([(x-15, y-5), (x+15, y+15)], fill='#FFFFFF')
 #     draw.ellipse([(x-10, y-8), (x+25, y+12)], fill='#FFFFFF')
 
-# bg.save('assets/background.png', 'PNG', optimize=True)
+# bg.save('assets/background.png', 'PNG', **PNG_OPTS)
 # print("Background saved: assets/background.png")
 
 print("\nAll assets generated successfully!")
@@ -1,6 +1,10 @@
 #!/usr/bin/env python3
-from PIL import Image, ImageDraw, ImageFont
+from PIL import Image, ImageColor, ImageDraw, ImageFont
+import hashlib
+import json
 import os
+import shutil
+import subprocess
 
 # Ensure output directories exist
 os.makedirs('res/mipmap-mdpi', exist_ok=True)
@@ -9,6 +13,65 @@ os.makedirs('assets', exist_ok=True)
 # Cell size for boats (we'll use 40x40 as base unit)
 CELL_SIZE = 40
 
+# PNG encoder settings, QB_FAST_ASSETS=1 saves with fast zlib while iterating on sprites
+PNG_OPTS_FAST = {'compress_level': 1}
+PNG_OPTS_SMALL = {'optimize': True, 'compress_level': 9}
+FAST_ASSETS = os.environ.get('QB_FAST_ASSETS') == '1'
+
+# oxipng, if installed, recompresses far better than optimize=True. Those PNGs are
+# saved fast and crushed together at the end
+OXIPNG = shutil.which('oxipng')
+oxipng_paths = []
+
+# Pixel hash, save settings and mtime of every PNG written, unchanged sprites
+# are not encoded again
+ASSET_CACHE_PATH = '.assets_cache.json'
+try:
+    with open(ASSET_CACHE_PATH) as f:
+        asset_cache = json.load(f)
+except (OSError, ValueError):
+    asset_cache = {}
+written_paths = []
+skipped_count = 0
+
+# Sprites the app ships are always saved small
+SHIPPED_ASSETS = {
+    'res/mipmap-mdpi/icon_64x64.png',
+    'assets/player_h2.png',
+    'assets/yacht_white_h2.png',
+    'assets/yacht_white_h3.png',
+    'assets/yacht_white_v2.png',
+    'assets/yacht_white_v3.png',
+}
+
+def save_png(img, path, colors=None):
+    """Save a generated sprite as PNG, as a palette image if it has at most colors colors"""
+    used = img.getcolors(colors) if colors else None
+    if used is not None:
+        # Flat sprites map exactly onto a small palette, gradients stay RGBA. Sizing the
+        # palette to the colors used lets 2 and 4 color sprites get 1 and 2 bit pixels
+        img = img.quantize(colors=len(used), method=Image.Quantize.FASTOCTREE)
+    small = path in SHIPPED_ASSETS or not FAST_ASSETS
+    crush = small and OXIPNG is not None
+    opts = PNG_OPTS_SMALL if small and not crush else PNG_OPTS_FAST
+
+    # Skip the encode if the file on disk came from this exact image and settings
+    key = hashlib.blake2b(
+        repr((img.mode, img.size, img.getpalette('RGBA'), opts, crush)).encode() + img.tobytes(),
+        digest_size=16,
+    ).hexdigest()
+    cached = asset_cache.get(path)
+    if cached and cached[0] == key and os.path.exists(path) and os.path.getmtime(path) == cached[1]:
+        global skipped_count
+        skipped_count += 1
+        return
+
+    if crush:
+        oxipng_paths.append(path)
+    img.save(path, 'PNG', **opts)
+    asset_cache[path] = [key, None]
+    written_paths.append(path)
+
 # 1. Create app icon (64x64) - Harbor with rowing boat
 img = Image.new('RGBA', (64, 64), (0, 0, 0, 0))
 draw = ImageDraw.Draw(img)
@@ -28,25 +91,25 @@ draw.line([(36, 30), (44, 26)], fill='#8B4513', width=2)
 # Small yacht in background (white)
 draw.ellipse([(8, 12), (20, 18)], fill='#FFFFFF', outline='#BDC3C7', width=1)
 
-img.save('res/mipmap-mdpi/icon_64x64.png', 'PNG', optimize=True)
+save_png(img, 'res/mipmap-mdpi/icon_64x64.png')
 print("Icon saved: res/mipmap-mdpi/icon_64x64.png")
 
 # 2. Create water tile (40x40) - animated later in code
-water = Image.new('RGBA', (CELL_SIZE, CELL_SIZE), (0, 0, 0, 0))
+# Base water color with slight gradient, one pixel column stretched to the tile
+water_column = Image.new('RGBA', (1, CELL_SIZE))
+water_column.putdata([
+    (int(74 + (y / CELL_SIZE) * 20), 0x90, 0xE2, 255)  # Gradient from lighter to darker
+    for y in range(CELL_SIZE)
+])
+water = water_column.resize((CELL_SIZE, CELL_SIZE), Image.NEAREST)
 draw = ImageDraw.Draw(water)
 
-# Base water color with slight gradient
-for y in range(CELL_SIZE):
-    intensity = int(74 + (y / CELL_SIZE) * 20)  # Gradient from lighter to darker
-    color = f'#{intensity:02x}90E2'
-    draw.line([(0, y), (CELL_SIZE, y)], fill=color, width=1)
-
 # Add some wave details
 draw.arc([(5, 5), (15, 15)], 0, 180, fill='#5FA3E8', width=1)
 draw.arc([(25, 15), (35, 25)], 0, 180, fill='#5FA3E8', width=1)
 draw.arc([(10, 25), (20, 35)], 0, 180, fill='#3D7CB8', width=1)
 
-water.save('assets/water.png', 'PNG', optimize=True)
+save_png(water, 'assets/water.png')
 print(f"Water tile saved: assets/water.png ({CELL_SIZE}x{CELL_SIZE})")
 
 # 3. Create exit/dock area (40x40)
@@ -65,7 +128,7 @@ arrow_color = '#FFD700'
 draw.polygon([(10, 20), (30, 20), (30, 15), (35, 20), (30, 25), (30, 20)], 
              fill=arrow_color, outline='#FFA500', width=1)
 
-exit_tile.save('assets/exit.png', 'PNG', optimize=True)
+save_png(exit_tile, 'assets/exit.png', colors=16)
 print(f"Exit tile saved: assets/exit.png ({CELL_SIZE}x{CELL_SIZE})")
 
 # 4. Create player rowing boat (40x40 for 1-cell, 40x80 for 2-cell horizontal)
@@ -103,57 +166,58 @@ def create_rowing_boat(width_cells=2, vertical=False):
 
 # Generate player boat variations
 player_boat_h2 = create_rowing_boat(2, False)
-player_boat_h2.save('assets/player_h2.png', 'PNG', optimize=True)
+save_png(player_boat_h2, 'assets/player_h2.png', colors=16)
 print(f"Player boat (horizontal 2) saved: assets/player_h2.png ({player_boat_h2.width}x{player_boat_h2.height})")
 
 player_boat_v2 = create_rowing_boat(2, True)
-player_boat_v2.save('assets/player_v2.png', 'PNG', optimize=True)
+save_png(player_boat_v2, 'assets/player_v2.png', colors=16)
 print(f"Player boat (vertical 2) saved: assets/player_v2.png ({player_boat_v2.width}x{player_boat_v2.height})")
 
 player_boat_h3 = create_rowing_boat(3, False)
-player_boat_h3.save('assets/player_h3.png', 'PNG', optimize=True)
+save_png(player_boat_h3, 'assets/player_h3.png', colors=16)
 print(f"Player boat (horizontal 3) saved: assets/player_h3.png ({player_boat_h3.width}x{player_boat_h3.height})")
 
 player_boat_v3 = create_rowing_boat(3, True)
-player_boat_v3.save('assets/player_v3.png', 'PNG', optimize=True)
+save_png(player_boat_v3, 'assets/player_v3.png', colors=16)
 print(f"Player boat (vertical 3) saved: assets/player_v3.png ({player_boat_v3.width}x{player_boat_v3.height})")
 
 # 5. Create yacht sprites (obstacles)
-def create_yacht(length_cells=2, vertical=False, color='#FFFFFF', accent='#3498DB'):
-    """Create a yacht/sailboat obstacle"""
-    if vertical:
-        w, h = CELL_SIZE, CELL_SIZE * length_cells
-    else:
-        w, h = CELL_SIZE * length_cells, CELL_SIZE
+# Palette slots of the yacht shape, filled in per color by create_yacht
+YACHT_CLEAR, YACHT_HULL, YACHT_HULL_OUTLINE, YACHT_ACCENT, YACHT_SAIL_OUTLINE = range(5)
+
+def create_yacht_shape(length_cells=2):
+    """Draw a horizontal yacht/sailboat obstacle once as a palette image"""
+    w, h = CELL_SIZE * length_cells, CELL_SIZE
     
-    yacht = Image.new('RGBA', (w, h), (0, 0, 0, 0))
+    yacht = Image.new('P', (w, h), YACHT_CLEAR)
     draw = ImageDraw.Draw(yacht)
     
     padding = 4
     
     # Yacht hull
     draw.ellipse([(padding, padding), (w-padding, h-padding)], 
-                 fill=color, outline='#BDC3C7', width=2)
+                 fill=YACHT_HULL, outline=YACHT_HULL_OUTLINE, width=2)
     
     # Add colored stripe
-    if vertical:
-        stripe_y = h // 2 - 3
-        draw.rectangle([(padding+2, stripe_y), (w-padding-2, stripe_y+6)], fill=accent)
-    else:
-        stripe_x = w // 2 - 3
-        draw.rectangle([(stripe_x, padding+2), (stripe_x+6, h-padding-2)], fill=accent)
+    stripe_x = w // 2 - 3
+    draw.rectangle([(stripe_x, padding+2), (stripe_x+6, h-padding-2)], fill=YACHT_ACCENT)
     
     # Add sail/mast indicator (small triangle)
     center_x, center_y = w//2, h//2
-    if vertical:
-        draw.polygon([(center_x, center_y-8), (center_x-4, center_y), (center_x+4, center_y)], 
-                     fill=accent, outline='#2C3E50', width=1)
-    else:
-        draw.polygon([(center_x-8, center_y), (center_x, center_y-4), (center_x, center_y+4)], 
-                     fill=accent, outline='#2C3E50', width=1)
+    draw.polygon([(center_x-8, center_y), (center_x, center_y-4), (center_x, center_y+4)], 
+                 fill=YACHT_ACCENT, outline=YACHT_SAIL_OUTLINE, width=1)
     
     return yacht
 
+def create_yacht(shape, color='#FFFFFF', accent='#3498DB'):
+    """Color a yacht shape by filling in its palette slots"""
+    yacht = shape.copy()
+    palette = [0, 0, 0, 0]
+    for slot_color in (color, '#BDC3C7', accent, '#2C3E50'):
+        palette += ImageColor.getrgb(slot_color) + (255,)
+    yacht.putpalette(palette, 'RGBA')
+    return yacht
+
 # Generate yacht variations (different colors and sizes)
 yacht_colors = [
     ('white', '#FFFFFF', '#3498DB'),
@@ -164,15 +228,17 @@ yacht_colors = [
 ]
 
 for size in [2, 3, 4]:
+    # Drawn once per size, only the palette differs between colors
+    yacht_shape = create_yacht_shape(size)
     for name, color, accent in yacht_colors:
         # Horizontal
-        yacht_h = create_yacht(size, False, color, accent)
-        yacht_h.save(f'assets/yacht_{name}_h{size}.png', 'PNG', optimize=True)
+        yacht_h = create_yacht(yacht_shape, color, accent)
+        save_png(yacht_h, f'assets/yacht_{name}_h{size}.png')
         print(f"Yacht {name} h{size} saved: assets/yacht_{name}_h{size}.png")
         
-        # Vertical
-        yacht_v = create_yacht(size, True, color, accent)
-        yacht_v.save(f'assets/yacht_{name}_v{size}.png', 'PNG', optimize=True)
+        # Vertical, the sail then points up
+        yacht_v = yacht_h.transpose(Image.TRANSPOSE)
+        save_png(yacht_v, f'assets/yacht_{name}_v{size}.png')
         print(f"Yacht {name} v{size} saved: assets/yacht_{name}_v{size}.png")
 
 # 6. Create grid border/frame pieces (optional decorative elements)
@@ -182,7 +248,7 @@ draw = ImageDraw.Draw(border)
 # Simple wooden border
 draw.rectangle([(0, 0), (CELL_SIZE, CELL_SIZE)], fill='#6F4E37', outline='#4A3320', width=3)
 
-border.save('assets/border.png', 'PNG', optimize=True)
+save_png(border, 'assets/border.png', colors=16)
 print(f"Border tile saved: assets/border.png ({CELL_SIZE}x{CELL_SIZE})")
 
 # 7. Create button/UI assets
@@ -212,18 +278,23 @@ def create_button_icon(icon_type, size=32):
     return img
 
 reset_icon = create_button_icon('reset')
-reset_icon.save('assets/icon_reset.png', 'PNG', optimize=True)
+save_png(reset_icon, 'assets/icon_reset.png', colors=16)
 print("Reset icon saved: assets/icon_reset.png")
 
 new_icon = create_button_icon('new')
-new_icon.save('assets/icon_new.png', 'PNG', optimize=True)
+save_png(new_icon, 'assets/icon_new.png', colors=16)
 print("New game icon saved: assets/icon_new.png")
 
 settings_icon = create_button_icon('settings')
-settings_icon.save('assets/icon_settings.png', 'PNG', optimize=True)
+save_png(settings_icon, 'assets/icon_settings.png', colors=16)
 print("Settings icon saved: assets/icon_settings.png")
 
 # 8. Create wave animation frames (for animated water)
+import math
+
+# sin((x + offset) * 0.3) for every x + offset a frame can sample, shared by all frames
+WAVE_SIN = [math.sin(i * 0.3) for i in range(CELL_SIZE * 2)]
+
 def create_wave_frame(frame_num, total_frames=4):
     """Create a frame of wave animation"""
     wave = Image.new('RGBA', (CELL_SIZE, CELL_SIZE), (0, 0, 0, 0))
@@ -232,21 +303,36 @@ def create_wave_frame(frame_num, total_frames=4):
     # Transparent - we'll overlay this on water
     offset = int((frame_num / total_frames) * CELL_SIZE)
     
-    # Draw wavy line
+    # Draw wavy line, all samples in one call
+    points = []
     for x in range(0, CELL_SIZE, 2):
-        y = int(CELL_SIZE // 2 + 3 * math.sin((x + offset) * 0.3))
+        y = int(CELL_SIZE // 2 + 3 * WAVE_SIN[x + offset])
         if 0 <= y < CELL_SIZE:
-            draw.point((x, y), fill='#FFFFFF80')  # Semi-transparent white
+            points.append((x, y))
+    draw.point(points, fill='#FFFFFF80')  # Semi-transparent white
     
     return wave
 
-import math
-
 for i in range(4):
     wave = create_wave_frame(i, 4)
-    wave.save(f'assets/wave_{i}.png', 'PNG', optimize=True)
+    save_png(wave, f'assets/wave_{i}.png')
     print(f"Wave frame {i} saved: assets/wave_{i}.png")
 
+if oxipng_paths:
+    subprocess.run(
+        [OXIPNG, '-o', '4', '--strip', 'safe', '-t', str(os.cpu_count() or 1)] + oxipng_paths,
+        check=True,
+    )
+    print(f"Recompressed {len(oxipng_paths)} PNGs with oxipng")
+
+# Recorded after oxipng, which rewrites the files
+for path in written_paths:
+    asset_cache[path][1] = os.path.getmtime(path)
+with open(ASSET_CACHE_PATH, 'w') as f:
+    json.dump(asset_cache, f, indent=1, sort_keys=True)
+if skipped_count:
+    print(f"Skipped {skipped_count} unchanged PNGs")
+
 print("\n" + "="*50)
 print("All QuasiBoats assets generated successfully!")
 print("="*50)